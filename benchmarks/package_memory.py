@@ -0,0 +1,105 @@
+# Run from the repository root: python benchmarks/package_memory.py
+#
+# The "plain" implementation is a hand-written stand-in for the old __dict__ based records
+# (the originals weren't hashable and can't be imported alongside the new ones), so its
+# figures approximate the old classes rather than measure them.
+import argparse
+import os.path
+import random
+import sys
+import time
+import tracemalloc
+
+from dataclasses import dataclass
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from packaging.version import Version
+from packaging.specifiers import SpecifierSet
+from packaging.tags import Tag
+
+from pypackage.util.package import PurePackage, RemoteSdistPackageFile, RemoteWheelPackageFile
+
+PYTHONS = ["cp39", "cp310", "cp311"]
+PLATFORMS = ["manylinux_2_17_x86_64", "manylinux_2_17_aarch64", "macosx_11_0_arm64", "win_amd64"]
+
+# Plain __dict__ records that parse their own Version/SpecifierSet/Tag objects, as a baseline
+class PlainPackage:
+    def __init__(self, name, version, pythonSpecifiers, dependencies = ()):
+        self.name = name
+        self.version = Version(version)
+        self.pythonSpecifiers = SpecifierSet(pythonSpecifiers)
+        self.dependencies = dependencies
+@dataclass(eq = False)
+class PlainRemoteSdistPackageFile:
+    name: str
+    version: Version
+    url: str
+    filename: str
+
+    def __post_init__(self):
+        self.version = Version(self.version)
+@dataclass(eq = False)
+class PlainRemoteWheelPackageFile:
+    name: str
+    version: Version
+    url: str
+    filename: str
+    tags: frozenset[Tag]
+    build: Optional[int]
+
+    def __post_init__(self):
+        self.version = Version(self.version)
+        self.tags = frozenset(Tag(*str(tag).split("-")) for tag in self.tags)
+
+IMPLEMENTATIONS = {
+    "plain": (PlainPackage, PlainRemoteSdistPackageFile, PlainRemoteWheelPackageFile),
+    "slotted": (PurePackage, RemoteSdistPackageFile, RemoteWheelPackageFile),
+}
+
+# Builds a synthetic dependency graph the way the locator would see it: every package is
+# parsed from strings, and every candidate file carries its own version string and tags.
+def buildGraph(implementation: str, packageCount: int, versionsPerPackage: int, dependenciesPerPackage: int):
+    packageClass, sdistClass, wheelClass = IMPLEMENTATIONS[implementation]
+    rng = random.Random(0)
+    packages = []
+    for c in range(packageCount):
+        name = f"package-{c}"
+        for minor in range(versionsPerPackage):
+            version = f"1.{minor}.0"
+            dependencies = rng.sample(packages, min(len(packages), dependenciesPerPackage))
+            packages.append(packageClass(name, version, ">=3.9", dependencies = dependencies))
+    # A list rather than a set, since the plain records aren't hashable
+    files = []
+    for package in packages:
+        version = str(package.version)
+        files.append(sdistClass(name = package.name, version = version, url = f"https://example.invalid/{package.name}-{version}.tar.gz", filename = f"{package.name}-{version}.tar.gz"))
+        for python in PYTHONS:
+            for platform in PLATFORMS:
+                filename = f"{package.name}-{version}-{python}-{python}-{platform}.whl"
+                files.append(wheelClass(name = package.name, version = version, url = f"https://example.invalid/{filename}", filename = filename, tags = {Tag(python, python, platform)}, build = None))
+    return packages, files
+
+def measure(implementation: str, args) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    packages, files = buildGraph(implementation, args.packages, args.versions, args.dependencies)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{implementation}: {len(packages)} packages, {len(files)} files, built in {elapsed:.2f}s, {current / 2**20:.1f} MiB retained, {peak / 2**20:.1f} MiB peak")
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measure memory used by package and file records")
+    parser.add_argument("--packages", type = int, default = 2000)
+    parser.add_argument("--versions", type = int, default = 3)
+    parser.add_argument("--dependencies", type = int, default = 5)
+    parser.add_argument("--implementation", choices = [*IMPLEMENTATIONS, "all"], default = "all")
+    args = parser.parse_args()
+
+    for implementation in IMPLEMENTATIONS if args.implementation == "all" else [args.implementation]:
+        measure(implementation, args)
+
+if __name__ == "__main__":
+    main()
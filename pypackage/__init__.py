@@ -4,12 +4,13 @@ from rich.logging import RichHandler
 import argparse
 import logging
 
-
-from pypackage.commands.package import PackageCommand
-from pypackage.commands.install import InstallCommand
-
 class PyPackage:
     def __init__(self):
+        # Imported here so the library modules can be used without pulling in the whole CLI
+        from pypackage.commands.package import PackageCommand
+        from pypackage.commands.install import InstallCommand
+        from pypackage.commands.uninstall import UninstallCommand
+
         self.logger = logging.getLogger("pypackage")
         self.console = Console(highlight = False)
         logging.basicConfig(format="%(message)s", handlers=[RichHandler(console = self.console, rich_tracebacks=True)])
@@ -19,6 +20,7 @@ class PyPackage:
         
         self.packageCommand = PackageCommand(subparsers, self.console, self.logger)
         self.installCommand = InstallCommand(subparsers, self.console, self.logger)
+        self.uninstallCommand = UninstallCommand(subparsers, self.console, self.logger)
 
     def run(self):
         args = self.argparser.parse_args()
@@ -6,30 +6,31 @@ import platformdirs
 import zipfile
 import os
 import os.path
-import itertools
+import subprocess
+import json
+import tomli
 
 from pypackage.commands import Command
-from pypackage.ppk import PPK
+from pypackage.ppk import PPK, PPKWheelDependencyFile, PPKVerificationError
+from pypackage.store import PackageStore
 from pypackage.venv import Venv
 from pypackage.venv.builder import PypackageBuilder
 from pypackage.locators.python_locator import PythonLocator
-from pypackage.util import formatPackageName, renderDepTree
-from pypackage.util.dependency import InstallableDependency
+from pypackage.util import formatPackageName, renderDepTree, dataPath
+
+GET_SITE_PACKAGES_ONELINER = "import sysconfig; print(sysconfig.get_path('purelib'))"
+# The venv is created with pip, so its copy of packaging is always around
+GET_SYS_TAGS_ONELINER = "import json; from pip._vendor.packaging.tags import sys_tags; print(json.dumps([str(t) for t in sys_tags()]))"
 
 class InstallCommand(Command):
     def __init__(self, subparsers, console, parentLogger):
         super().__init__(subparsers, console, parentLogger, "install", "Install a .ppk file")
         self.parser.add_argument("path")
+        self.parser.add_argument("--trust-store", action = "store_true", help = "Don't verify dependencies that are already in the package store")
 
         self.venv: Venv = Venv(PypackageBuilder(clear = True, with_pip = True))
         self.locator: PythonLocator = PythonLocator()
-
-    def extractPPKDependencies(self):
-        for dep in itertools.chain(self.ppk.dependencyFiles, self.ppk.sourceFiles):
-            self.console.print(f"Extracting [cyan]{dep.path.name}")
-            with open(os.path.join(self.cachePath, dep.path.name), "wb") as file:
-                file.write(dep.data)
-                yield InstallableDependency(dep.name, dep.version, )
+        self.store: PackageStore = None
 
     def promptForPython(self, pythons):
         self.console.print("[bold]Multiple Python interpreters are available[/bold] to create the virtual environment with.\nWhich would you like to use?")
@@ -43,11 +44,85 @@ class InstallCommand(Command):
                 break
             self.console.print("[bold red]Invalid choice.")
         return pythons[result-1]
-        
+
+    def verifyPPK(self, ppkfile, trustStore):
+        manifest = PPK.manifestFromZip(ppkfile)
+        if not manifest:
+            self.console.print("[bold yellow]WARNING[/bold yellow]: package has no manifest, skipping verification.")
+            return
+        # Only peek at the store here, it isn't created until the install is confirmed
+        store = PackageStore.default(create = False)
+        trusted = (lambda path, entry: path.startswith("dependencies/") and store.contains(entry.sha256)) if trustStore else None
+        try:
+            PPK.verifyZip(ppkfile, manifest, trusted)
+        except PPKVerificationError as e:
+            for path, reason in e.failures.items():
+                self.logger.error(f"{path}: {reason}")
+            self.logger.critical("Package is corrupted!")
+            exit(102)
+
+    def selectWheels(self, venvPython):
+        tags = json.loads(subprocess.run([venvPython, "-c", GET_SYS_TAGS_ONELINER], capture_output = True, text = True, check = True).stdout)
+        priorities = {tag: c for c, tag in enumerate(tags)}
+        best = {}
+        for dep in self.ppk.dependencyFiles:
+            if not isinstance(dep, PPKWheelDependencyFile):
+                continue
+            priority = min((priorities[str(tag)] for tag in dep.tags if str(tag) in priorities), default = None)
+            if priority is None:
+                continue
+            if dep.name not in best or priority < best[dep.name][0]:
+                best[dep.name] = (priority, dep)
+        missing = {dep.name for dep in self.ppk.dependencyFiles} - best.keys()
+        return [dep for _, dep in best.values()], missing
+
+    def linkDependencies(self, venvPython, wheels):
+        sitePackages = subprocess.run([venvPython, "-c", GET_SITE_PACKAGES_ONELINER], capture_output = True, text = True, check = True).stdout.strip()
+        binPath = os.path.dirname(venvPython)
+        wheels = [
+            (wheel, entry.sha256 if (entry := self.ppk.manifest.get(f"dependencies/{wheel.path.name}")) else PackageStore.digest(wheel.data))
+            for wheel in wheels
+        ]
+        # Take the references before adding anything so a concurrent uninstall can't collect them
+        self.store.retain(self.ppk.name, [digest for _, digest in wheels])
+        for wheel, digest in wheels:
+            if self.store.contains(digest):
+                self.console.print(f"Linking [cyan]{wheel.path.name}[/cyan] (already stored)")
+            else:
+                self.console.print(f"Storing [cyan]{wheel.path.name}")
+                self.store.add(wheel.data, digest)
+            self.store.link(digest, sitePackages)
+            self.store.installScripts(digest, binPath, venvPython)
+        self.store.collectGarbage()
+
+    def installSdists(self, venvPython, names):
+        for name in sorted(names):
+            sdist = next((dep for dep in self.ppk.dependencyFiles if dep.name == name and not isinstance(dep, PPKWheelDependencyFile)), None)
+            if sdist is None:
+                self.logger.critical(f"{name} has no wheel compatible with {venvPython} and no sdist to build!")
+                exit(103)
+            self.console.print(f"Building [cyan]{sdist.path.name}[/cyan] (no compatible wheel)")
+            sdistPath = os.path.join(self.cachePath, sdist.path.name)
+            with open(sdistPath, "wb") as file:
+                file.write(sdist.data)
+            try:
+                subprocess.run([venvPython, "-m", "pip", "install", "--no-deps", sdistPath], capture_output = True, text = True, check = True)
+            except subprocess.CalledProcessError as e:
+                self.logger.error(e.stderr)
+                self.logger.critical(f"Failed to build {sdist.path.name}!")
+                exit(103)
+
     def run(self, args):
-        with self.console.status("Reading package data", spinner = "dots12"), zipfile.ZipFile(args.path) as ppkfile:
-            self.ppk = PPK.fromZipfile(ppkfile)
-        self.installPath = os.path.join(platformdirs.user_data_path("pypackage") if os.geteuid() != 0 else platformdirs.site_data_path("pypackage"), "packages", f"{self.ppk.name}")
+        try:
+            with zipfile.ZipFile(args.path) as ppkfile:
+                with self.console.status("Verifying package", spinner = "dots12"):
+                    self.verifyPPK(ppkfile, args.trust_store)
+                with self.console.status("Reading package data", spinner = "dots12"):
+                    self.ppk = PPK.fromZipfile(ppkfile)
+        except (zipfile.BadZipFile, KeyError, tomli.TOMLDecodeError, json.JSONDecodeError) as e:
+            self.logger.critical(f"{args.path} is not a valid package ({type(e).__name__}: {e})")
+            exit(102)
+        self.installPath = os.path.join(dataPath(), "packages", f"{self.ppk.name}")
         self.cachePath = os.path.join(platformdirs.user_cache_path("pypackage"), f"{self.ppk.name}-build")
         os.makedirs(self.cachePath, exist_ok = True)
 
@@ -59,6 +134,7 @@ class InstallCommand(Command):
             self.console.print("[bold red]Aborted.")
             exit(1)
         self.console.print()
+        self.store = PackageStore.default()
         
         pythons = list(self.locator.locatePythonExecutables(self.ppk.python))
         assert len(pythons) > 0, "You don't have any elegible Python interpreters to make a virtualenv with. How is that even possible?!"
@@ -67,9 +143,12 @@ class InstallCommand(Command):
         else:
             python = pythons[0]
 
-        with self.console.status("Extracting package...", spinner = "dots12"):
-            self.extractPPKDependencies()
         with self.console.status("Creating virtualenv...", spinner = "dots12"):
             self.venv.create(python, self.installPath)
-        
-        
\ No newline at end of file
+        venvPython = os.path.join(self.installPath, "bin", "python")
+        wheels, missing = self.selectWheels(venvPython)
+        with self.console.status("Linking dependencies...", spinner = "dots12"):
+            self.linkDependencies(venvPython, wheels)
+        if missing:
+            with self.console.status("Building dependencies without wheels...", spinner = "dots12"):
+                self.installSdists(venvPython, missing)
@@ -1,5 +1,6 @@
 import platformdirs
 
+from pypi_simple import PYPI_SIMPLE_ENDPOINT
 from rich.progress import Progress, DownloadColumn
 from rich.prompt import Confirm
 from rich.tree import Tree
@@ -17,6 +18,7 @@ from pypackage.commands import Command
 from pypackage.buildsystems import BUILD_SYSTEMS
 from pypackage.ppk import PPK, PPKDependencyFile
 from pypackage.locators.package_locator import PackageLocator
+from pypackage.locators.local_warehouse import LocalWarehouse
 from pypackage.util import renderDepTree, formatPackageName, nthitem, ProjectMeta
 from pypackage.util.pooled_downloader import PooledDownloader
 from pypackage.util.progress_manager import RichProgressManager
@@ -25,7 +27,8 @@ class PackageCommand(Command):
     def __init__(self, subparsers, console, parentLogger):
         super().__init__(subparsers, console, parentLogger, "package", "Package a Python project to a .ppk file")
         self.parser.add_argument("path", nargs = "?", default = ".")
-        self.locator = PackageLocator()
+        self.parser.add_argument("-w", "--warehouse", action = "append", dest = "warehouses", metavar = "URL_OR_DIR", help = "Simple API URL or local directory of wheels and sdists to search (default: PyPI)")
+        self.parser.add_argument("--artifact-cache", action = "store_true", help = "Also search packages previously downloaded into the pypackage cache")
 
     def locatePackages(self, status, dependencies):
         for c, packages in enumerate(nthitem(self.locator.locatePackages(dependencies.values()), 1)):
@@ -45,6 +48,14 @@ class PackageCommand(Command):
         return os.path.join(platformdirs.user_cache_path("pypackage"), f"{self.projectMeta.name}-build", f"{self.projectMeta.name}-{self.projectMeta.version}.tar.gz")
 
     def run(self, args):
+        warehouses = args.warehouses or [PYPI_SIMPLE_ENDPOINT]
+        if args.artifact_cache:
+            warehouses = [LocalWarehouse.fromArtifactCache(), *warehouses]
+        try:
+            self.locator = PackageLocator(warehouses)
+        except NotADirectoryError as e:
+            self.logger.critical(str(e))
+            exit(101)
         os.chdir(args.path)
         
         if not os.path.isfile("pyproject.toml"):
@@ -71,7 +82,7 @@ class PackageCommand(Command):
             exit(2)
 
         self.console.print()
-        with self.console.status("Locating packages", spinner = "dots12") as status:
+        with self.console.status("Locating packages", spinner = "dots12") as status, self.locator:
             packages = list(self.locatePackages(status, dependencies))
         
         self.console.print("[bold]Downloading packages...")
@@ -95,16 +106,17 @@ class PackageCommand(Command):
         ppkPath = f"dist/{self.projectMeta.name}-{self.projectMeta.version}.ppk"
         with self.console.status("[bold]Creating final distribution...", spinner = "dots12"), zipfile.ZipFile(ppkPath, "w") as ppkfile:
             ppk = PPK(*tools.generateMeta(), tree, list(map(PPKDependencyFile.fromPath, packagePaths)), [PPKDependencyFile.fromPath(builtProject)])
-            with ppkfile.open("metadata.toml", "w") as metafile:
-                ppk.dumpMeta(metafile)
             with ppkfile.open("dependencies.dat", "w") as treefile:
                 ppk.dumpDependencyTree(treefile)
             for file in ppk.dependencyFiles:
                 self.console.print(f"Adding [cyan]{file.path.name}")
-                file.dumpToZip(ppkfile, "dependencies")
+                ppk.manifest[f"dependencies/{file.path.name}"] = file.dumpToZip(ppkfile, "dependencies")
             for file in ppk.sourceFiles:
                 self.console.print(f"Adding [cyan]{file.path.name}")
-                file.dumpToZip(ppkfile, "source")
+                ppk.manifest[f"source/{file.path.name}"] = file.dumpToZip(ppkfile, "source")
+            # Written last so the manifest covers everything above
+            with ppkfile.open("metadata.toml", "w") as metafile:
+                ppk.dumpMeta(metafile)
             
         self.console.print("Creating final distribution... done")
         self.console.print(f"[green]Distribution located at {ppkPath}")
@@ -0,0 +1,33 @@
+from rich.prompt import Confirm
+
+import os
+import os.path
+import shutil
+
+from pypackage.commands import Command
+from pypackage.store import PackageStore
+from pypackage.util import dataPath
+
+class UninstallCommand(Command):
+    def __init__(self, subparsers, console, parentLogger):
+        super().__init__(subparsers, console, parentLogger, "uninstall", "Uninstall an installed package")
+        self.parser.add_argument("name")
+
+    def run(self, args):
+        installPath = os.path.join(dataPath(), "packages", args.name)
+        if not os.path.isdir(installPath):
+            self.logger.critical(f"{args.name} is not installed!")
+            exit(101)
+        self.console.print(f"Going to remove [bold cyan]{args.name}[/bold cyan] from [underline]{installPath}.")
+        if not Confirm.ask("Uninstall software?"):
+            self.console.print("[bold red]Aborted.")
+            exit(1)
+
+        with self.console.status("Removing package...", spinner = "dots12"):
+            shutil.rmtree(installPath)
+            store = PackageStore.default()
+            store.release(args.name)
+        with self.console.status("Collecting unused dependencies...", spinner = "dots12"):
+            removed = store.collectGarbage()
+        self.console.print(f"Removed [bold cyan]{len(removed)}[/bold cyan] unused dependencies from the store.")
+        self.console.print("[bold green]Uninstall succeeded!")
@@ -0,0 +1,167 @@
+from typing import Optional
+from collections.abc import Iterable
+
+import os
+import os.path
+import json
+import tempfile
+import concurrent.futures
+
+from hashlib import sha256
+from pathlib import Path
+
+import platformdirs
+
+from pypi_simple import NoSuchProjectError, ProjectPage, DistributionPackage
+from packaging.utils import canonicalize_name, parse_wheel_filename, parse_sdist_filename, InvalidWheelFilename, InvalidSdistFilename
+
+INDEX_VERSION = 1
+SDIST_SUFFIXES = (".tar.gz", ".zip")
+
+def _hashFile(path: str) -> str:
+    digest = sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(2**20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _parseFilename(filename: str) -> Optional[tuple[str, str, str, list[str]]]:
+    try:
+        if filename.endswith(".whl"):
+            name, version, _, tags = parse_wheel_filename(filename)
+            return name, str(version), "wheel", sorted(map(str, tags))
+        elif filename.endswith(SDIST_SUFFIXES):
+            name, version = parse_sdist_filename(filename)
+            return name, str(version), "sdist", []
+    except (InvalidWheelFilename, InvalidSdistFilename):
+        pass
+    return None
+
+# A find-links style warehouse backed by directories of wheels and sdists. The
+# directories are indexed into a name -> files mapping that is persisted in the cache
+# and refreshed incrementally: directories whose mtime hasn't changed only get their
+# indexed files stat'd, and only new or modified files get parsed and hashed again.
+class LocalWarehouse:
+    def __init__(self, directories: Iterable[str | Path], indexPath: Optional[str | Path] = None, workers: int = 4):
+        self.directories = sorted({os.path.realpath(directory) for directory in directories})
+        if indexPath is None:
+            key = sha256("\0".join(self.directories).encode("utf-8")).hexdigest()[:16]
+            indexPath = os.path.join(platformdirs.user_cache_path("pypackage"), "warehouses", f"{key}.json")
+        self.indexPath = Path(indexPath)
+        self.workers = workers
+        # directory -> mtime
+        self.directoryTimes: dict[str, int] = {}
+        # path -> [name, version, type, tags, sha256, size, mtime]
+        self.files: dict[str, list] = {}
+        # name -> paths
+        self.projects: dict[str, list[str]] = {}
+        self.loaded = False
+
+    @classmethod
+    def fromArtifactCache(cls, **kwargs) -> "LocalWarehouse":
+        return cls([platformdirs.user_cache_path("pypackage")], **kwargs)
+
+    def __repr__(self):
+        return f"LocalWarehouse({self.directories!r})"
+
+    def _loadIndex(self) -> None:
+        try:
+            with open(self.indexPath, "r") as indexFile:
+                index = json.load(indexFile)
+        except (OSError, ValueError):
+            return
+        if index.get("version") != INDEX_VERSION:
+            return
+        self.directoryTimes = index["directories"]
+        self.files = {path: entry for paths in index["projects"].values() for path, *entry in paths}
+
+    def _saveIndex(self) -> None:
+        os.makedirs(self.indexPath.parent, exist_ok = True)
+        with tempfile.NamedTemporaryFile("w", dir = self.indexPath.parent, delete = False) as indexFile:
+            json.dump({
+                "version": INDEX_VERSION,
+                "directories": self.directoryTimes,
+                "projects": {name: [[path, *self.files[path]] for path in paths] for name, paths in self.projects.items()}
+            }, indexFile, separators = (",", ":"))
+        os.replace(indexFile.name, self.indexPath)
+
+    def _scanDirectory(self, directory: str, pool: concurrent.futures.Executor, seen: set[str], futures: dict) -> None:
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return
+        seen.add(directory)
+        unchanged = self.directoryTimes.get(directory) == mtime
+        self.directoryTimes[directory] = mtime
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks = False):
+                    self._scanDirectory(entry.path, pool, seen, futures)
+                    continue
+                cached = self.files.get(entry.path)
+                # An unchanged directory has no new files, but indexed ones may have been rewritten in place
+                if cached is None and unchanged:
+                    continue
+                if (parsed := _parseFilename(entry.name)) is None or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if cached and cached[5:] == [stat.st_size, stat.st_mtime_ns]:
+                    continue
+                futures[pool.submit(_hashFile, entry.path)] = (entry.path, parsed, stat)
+
+    def refresh(self) -> None:
+        if not self.loaded:
+            self._loadIndex()
+            self.loaded = True
+        previousTimes = dict(self.directoryTimes)
+        seen = set()
+        futures = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers = self.workers) as pool:
+            for directory in self.directories:
+                self._scanDirectory(directory, pool, seen, futures)
+            for future in concurrent.futures.as_completed(futures):
+                path, (name, version, packageType, tags), stat = futures[future]
+                self.files[path] = [canonicalize_name(name), version, packageType, tags, future.result(), stat.st_size, stat.st_mtime_ns]
+        # Drop files that disappeared from rescanned (or vanished) directories
+        changed = {directory for directory in seen if previousTimes.get(directory) != self.directoryTimes[directory]}
+        for directory in previousTimes.keys() - seen:
+            del self.directoryTimes[directory]
+            changed.add(directory)
+        for path in [path for path in self.files if os.path.dirname(path) in changed and not os.path.isfile(path)]:
+            del self.files[path]
+
+        self.projects = {}
+        for path, entry in self.files.items():
+            self.projects.setdefault(entry[0], []).append(path)
+        if futures or changed or not self.indexPath.is_file():
+            self._saveIndex()
+
+    def get_project_page(self, project: str) -> ProjectPage:
+        if not self.loaded:
+            self.refresh()
+        name = canonicalize_name(project)
+        if name not in self.projects:
+            raise NoSuchProjectError(project, Path(self.directories[0]).as_uri() if self.directories else "")
+        packages = []
+        for path in self.projects[name]:
+            _, version, packageType, _, digest, _, _ = self.files[path]
+            packages.append(DistributionPackage(
+                filename = os.path.basename(path),
+                url = Path(path).as_uri(),
+                project = name,
+                version = version,
+                package_type = packageType,
+                digests = {"sha256": digest},
+                requires_python = None,
+                has_sig = None
+            ))
+        return ProjectPage(project = name, packages = packages, repository_version = None, last_serial = None)
+
+    def __enter__(self):
+        if not self.loaded:
+            self.refresh()
+        return self
+    def __exit__(self, excType, excVal, excTb):
+        pass
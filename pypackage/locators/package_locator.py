@@ -1,60 +1,154 @@
-from typing import Optional
+from typing import Optional, Union
 from collections.abc import Collection, Iterable, Iterator
 
-from pypi_simple import PyPISimple, NoSuchProjectError, PYPI_SIMPLE_ENDPOINT, DistributionPackage
-from packaging.version import Version, InvalidVersion
+import os
+import os.path
+import json
+import time
+import tempfile
+import threading
+import concurrent.futures
+
+from contextlib import ExitStack
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+import platformdirs
+
+from pypi_simple import PyPISimple, NoSuchProjectError, PYPI_SIMPLE_ENDPOINT, DistributionPackage, ProjectPage
+from packaging.version import InvalidVersion
 from packaging.tags import Tag, sys_tags
-from packaging.utils import parse_wheel_filename
+from packaging.utils import parse_wheel_filename, canonicalize_name
 
+from pypackage.locators.local_warehouse import LocalWarehouse
+from pypackage.util import internVersion
 from pypackage.util.package import PurePackage, RemotePackageFile, RemoteSdistPackageFile, RemoteWheelPackageFile
 
-# If you don't look at it, it can't hurt you.
-DistributionPackage.__hash__ = lambda self: hash(self.url) + hash(self.filename)
-
 class NoSdistFound(Exception):
     def __init__(self, dependency: PurePackage):
         super().__init__()
         self.dependency = dependency
 
+def warehouseFromUrl(url: str) -> Union[PyPISimple, LocalWarehouse]:
+    scheme = urlparse(url).scheme
+    # Anything without a scheme (or with a drive letter for one) is a local directory
+    if scheme == "file":
+        path = url2pathname(urlparse(url).path)
+    elif len(scheme) <= 1:
+        path = url
+    else:
+        return PyPISimple(url)
+    if not os.path.isdir(path):
+        raise NotADirectoryError(f"Warehouse {url} is not a directory")
+    return LocalWarehouse([path])
+
+# Remembers which projects a warehouse didn't have, so we don't ask again for a while
+class NegativeCache:
+    def __init__(self, path: Optional[str] = None, ttl: float = 3600):
+        self.path = os.path.abspath(path or os.path.join(platformdirs.user_cache_path("pypackage"), "not-found.json"))
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.dirty = False
+        try:
+            with open(self.path, "r") as cacheFile:
+                self.entries: dict[str, dict[str, float]] = json.load(cacheFile)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def isMissing(self, warehouseKey: str, name: str) -> bool:
+        with self.lock:
+            return self.entries.get(warehouseKey, {}).get(canonicalize_name(name), 0) > time.time()
+    def markMissing(self, warehouseKey: str, name: str) -> None:
+        with self.lock:
+            self.entries.setdefault(warehouseKey, {})[canonicalize_name(name)] = time.time() + self.ttl
+            self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        now = time.time()
+        with self.lock:
+            entries = {key: {name: expiry for name, expiry in names.items() if expiry > now} for key, names in self.entries.items()}
+            self.dirty = False
+        os.makedirs(os.path.dirname(self.path), exist_ok = True)
+        with tempfile.NamedTemporaryFile("w", dir = os.path.dirname(self.path), delete = False) as cacheFile:
+            json.dump({key: names for key, names in entries.items() if names}, cacheFile)
+        os.replace(cacheFile.name, self.path)
+
 class PackageLocator:
-    def __init__(self, warehouseUrls: Iterable[str] = (PYPI_SIMPLE_ENDPOINT,)):
-        self.warehouses = [PyPISimple(url) for url in warehouseUrls]
-    def sdistForPackage(self, dependency: PurePackage) -> Optional[RemoteSdistPackageFile]:
+    # Warehouses are listed in priority order: when several of them have the same file, the earlier one wins.
+    def __init__(
+        self,
+        warehouses: Iterable[Union[str, PyPISimple, LocalWarehouse]] = (PYPI_SIMPLE_ENDPOINT,),
+        negativeCache: Optional[NegativeCache] = None
+    ):
+        self.warehouses = [warehouseFromUrl(warehouse) if isinstance(warehouse, str) else warehouse for warehouse in warehouses]
+        self.negativeCache = negativeCache or NegativeCache()
+        self.pages: dict[str, list[ProjectPage]] = {}
+        self.pool = None
+        self.exitStack = None
+
+    def __enter__(self):
+        self.exitStack = ExitStack()
         for warehouse in self.warehouses:
-            with warehouse:
-                try:
-                    project = warehouse.get_project_page(dependency.name)
-                except NoSuchProjectError:
+            self.exitStack.enter_context(warehouse)
+        self.pool = self.exitStack.enter_context(concurrent.futures.ThreadPoolExecutor(max_workers = max(len(self.warehouses), 1)))
+        return self
+    def __exit__(self, excType, excVal, excTb):
+        try:
+            self.exitStack.__exit__(excType, excVal, excTb)
+        finally:
+            self.exitStack = self.pool = None
+            self.pages = {}
+            self.negativeCache.save()
+
+    def _queryWarehouse(self, warehouse: Union[PyPISimple, LocalWarehouse], name: str) -> Optional[ProjectPage]:
+        # Local warehouses have their own index, only remember misses for remote ones
+        warehouseKey = getattr(warehouse, "endpoint", None)
+        if warehouseKey and self.negativeCache.isMissing(warehouseKey, name):
+            return None
+        try:
+            return warehouse.get_project_page(name)
+        except NoSuchProjectError:
+            if warehouseKey:
+                self.negativeCache.markMissing(warehouseKey, name)
+            return None
+
+    def projectPages(self, name: str) -> list[ProjectPage]:
+        assert self.pool is not None, "PackageLocator must be used as a context manager"
+        if name not in self.pages:
+            futures = [self.pool.submit(self._queryWarehouse, warehouse, name) for warehouse in self.warehouses]
+            self.pages[name] = [page for page in (future.result() for future in futures) if page is not None]
+        return self.pages[name]
+
+    def _matchingPackages(self, dependency: PurePackage, packageType: str) -> Iterator[DistributionPackage]:
+        seen = set()
+        for page in self.projectPages(dependency.name):
+            for package in page.packages:
+                if package.package_type != packageType or package.filename in seen:
                     continue
-                for package in project.packages:
-                    try:
-                        if Version(package.version) == dependency.version and package.package_type == "sdist":
-                            return RemoteSdistPackageFile(package.url, package.filename, package.name, Version(package.version))
-                    except InvalidVersion:
+                try:
+                    if internVersion(package.version) != dependency.version:
                         continue
+                except (InvalidVersion, TypeError):
+                    continue
+                seen.add(package.filename)
+                yield package
+
+    def sdistForPackage(self, dependency: PurePackage) -> Optional[RemoteSdistPackageFile]:
+        for package in self._matchingPackages(dependency, "sdist"):
+            return RemoteSdistPackageFile(name = package.project or dependency.name, version = internVersion(package.version), url = package.url, filename = package.filename)
         return None
     def wheelsForPackage(self, dependency: PurePackage, acceptedTags: Collection[Tag]) -> Iterator[RemoteWheelPackageFile]:
-        for warehouse in self.warehouses:
-            with warehouse:
-                try:
-                    project = warehouse.get_project_page(dependency.name)
-                except NoSuchProjectError:
-                    continue
-                for package in project.packages:
-                    try:
-                        if Version(package.version) == dependency.version and package.package_type == "wheel":
-                            _, _, build, wheelTags = parse_wheel_filename(package.filename)
-                            for wheelTag in wheelTags:
-                                for acceptedTag in acceptedTags:
-                                    if wheelTag == acceptedTag:
-                                        yield RemoteWheelPackageFile(package.url, package.filename, package.name, Version(package.version), wheelTags, build)
-                                        break
-                    except InvalidVersion:
-                        continue
+        acceptedTags = set(acceptedTags)
+        for package in self._matchingPackages(dependency, "wheel"):
+            _, _, build, wheelTags = parse_wheel_filename(package.filename)
+            if not wheelTags.isdisjoint(acceptedTags):
+                yield RemoteWheelPackageFile(name = package.project or dependency.name, version = internVersion(package.version), url = package.url, filename = package.filename, tags = wheelTags, build = build)
 
     def locatePackages(self, dependencies: Iterable[PurePackage], tags = list(sys_tags())) -> Iterable[PurePackage, set[RemotePackageFile]]:
         for c, dependency in enumerate(dependencies, 1):
             sdist = self.sdistForPackage(dependency)
             if not sdist:
                 raise NoSdistFound(dependency)
-            yield dependency, set((sdist,)) | set(self.wheelsForPackage(dependency, tags))
\ No newline at end of file
+            yield dependency, set((sdist,)) | set(self.wheelsForPackage(dependency, tags))
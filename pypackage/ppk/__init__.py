@@ -1,14 +1,17 @@
-from typing import Optional, BinaryIO
-from collections.abc import Collection, Iterator
+from typing import Optional, BinaryIO, NamedTuple
+from collections.abc import Collection, Iterator, Callable, Mapping
 
 import tomli
 import tomli_w
 
 import json
 import os.path
+import zlib
+import concurrent.futures
 
-from zipfile import ZipFile, Path as ZipPath
-from dataclasses import dataclass
+from hashlib import sha256
+from zipfile import ZipFile, BadZipFile, Path as ZipPath
+from dataclasses import dataclass, field
 from pathlib import Path
 
 from packaging.version import Version
@@ -16,17 +19,30 @@ from packaging.specifiers import SpecifierSet
 from packaging.tags import Tag
 from packaging.utils import parse_wheel_filename, parse_sdist_filename
 
-from pypackage.util import flattenDict
+from pypackage.util import flattenDict, internVersion, internTags
 
-DEFAULT_PPK_VERSION = Version("1.0")
+DEFAULT_PPK_VERSION = Version("1.1")
+CHUNK_SIZE = 2**20
 
-@dataclass
+class ManifestEntry(NamedTuple):
+    sha256: str
+    size: int
+
+class PPKVerificationError(Exception):
+    def __init__(self, failures: Mapping[str, str]):
+        super().__init__(", ".join(f"{path}: {reason}" for path, reason in failures.items()))
+        self.failures = failures
+
+@dataclass(slots = True, eq = False)
 class PPKDependencyFile:
     path: Path
     data: bytes
     name: str
     version: Version
 
+    def __post_init__(self):
+        self.version = internVersion(self.version)
+
     @classmethod
     def fromPath(cls, path: str | Path) -> "PPKDependencyFile":
         path = Path(path)
@@ -37,18 +53,28 @@ class PPKDependencyFile:
                 return PPKDependencyFile(path, file.read(), *parse_sdist_filename(path.name))
             else:
                 raise ValueError(f"Cannot use file {path}!")
+    def __eq__(self, other):
+        if not isinstance(other, PPKDependencyFile):
+            return NotImplemented
+        return self.path == other.path
     def __hash__(self):
         return hash(self.path)
-    def dumpToZip(self, zip: ZipFile, dir = "") -> None:
+    def dumpToZip(self, zip: ZipFile, dir = "") -> ManifestEntry:
+        digest = sha256()
         with zip.open(os.path.join(dir, self.path.name), "w") as file:
-            file.write(self.data)
-@dataclass
+            for offset in range(0, len(self.data), CHUNK_SIZE):
+                chunk = self.data[offset:offset + CHUNK_SIZE]
+                digest.update(chunk)
+                file.write(chunk)
+        return ManifestEntry(digest.hexdigest(), len(self.data))
+@dataclass(slots = True, eq = False)
 class PPKWheelDependencyFile(PPKDependencyFile):
     build: Optional[tuple[int, str]]
-    tags: set[Tag]
+    tags: frozenset[Tag]
 
-    def __hash__(self):
-        return hash(self.path)
+    def __post_init__(self):
+        PPKDependencyFile.__post_init__(self)
+        self.tags = internTags(self.tags)
     
 
 @dataclass
@@ -61,6 +87,7 @@ class PPK:
     dependencyFiles: Collection[PPKDependencyFile]
     sourceFiles: Collection[PPKDependencyFile]
     ppkVersion: Version = DEFAULT_PPK_VERSION
+    manifest: dict[str, ManifestEntry] = field(default_factory = dict)
 
     def fileDependsOn(self, file: PPKDependencyFile) -> Collection[PPKDependencyFile]:
         deps = flattenDict(self.dependencyTree)[file.name]
@@ -75,11 +102,59 @@ class PPK:
         for path in ZipPath(zip, path).iterdir():
             assert path.is_file(), "ppk files should only have files in the dependencies folder!"
             with path.open("rb") as file:
-                if ext := os.path.splitext(path.name)[1] == ".whl":
+                if (ext := os.path.splitext(path.name)[1]) == ".whl":
                     yield PPKWheelDependencyFile(path, file.read(), *parse_wheel_filename(path.name))
-                elif ext == ".gz":
+                elif ext in (".gz", ".zip"):
                     yield PPKDependencyFile(path, file.read(), *parse_sdist_filename(path.name))
     @classmethod
+    def manifestFromZip(cls, zip: ZipFile) -> dict[str, ManifestEntry]:
+        with zip.open("metadata.toml") as metafile:
+            meta = tomli.load(metafile)["pypackage"]
+        return {path: ManifestEntry(entry["sha256"], entry["size"]) for path, entry in meta.get("manifest", {}).items()}
+    @staticmethod
+    def _verifyEntry(zip: ZipFile, path: str, expected: ManifestEntry) -> Optional[str]:
+        digest = sha256()
+        size = 0
+        try:
+            with zip.open(path) as file:
+                while chunk := file.read(CHUNK_SIZE):
+                    digest.update(chunk)
+                    size += len(chunk)
+        except (BadZipFile, zlib.error, EOFError) as e:
+            return f"unreadable ({e})"
+        if size != expected.size:
+            return f"expected {expected.size} bytes, got {size}"
+        if digest.hexdigest() != expected.sha256:
+            return f"expected sha256 {expected.sha256}, got {digest.hexdigest()}"
+        return None
+    @classmethod
+    def verifyZip(
+        cls,
+        zip: ZipFile,
+        manifest: Mapping[str, ManifestEntry],
+        trusted: Optional[Callable[[str, ManifestEntry], bool]] = None,
+        workers: int = 4
+    ) -> None:
+        failures = {}
+        names = set(zip.namelist())
+        for path in names - manifest.keys():
+            if path.startswith(("dependencies/", "source/")) and not path.endswith("/"):
+                failures[path] = "not in manifest"
+        for path in manifest.keys() - names:
+            failures[path] = "missing from archive"
+        # ZipFile serializes the underlying reads, but hashing and decompression run in parallel
+        with concurrent.futures.ThreadPoolExecutor(max_workers = workers) as pool:
+            futures = {
+                pool.submit(cls._verifyEntry, zip, path, entry): path
+                for path, entry in manifest.items()
+                if path in names and not (trusted and trusted(path, entry))
+            }
+            for future in concurrent.futures.as_completed(futures):
+                if failure := future.result():
+                    failures[futures[future]] = failure
+        if failures:
+            raise PPKVerificationError(failures)
+    @classmethod
     def fromZipfile(cls, zip: ZipFile) -> "PPK":
         with zip.open("metadata.toml") as metafile:
             meta = tomli.load(metafile)["pypackage"]
@@ -93,7 +168,8 @@ class PPK:
             dependencyTree,
             set(cls.dependenciesFromZip(zip, "dependencies/")),
             set(cls.dependenciesFromZip(zip, "source/")),
-            Version(meta["meta"]["ppk-version"])
+            Version(meta["meta"]["ppk-version"]),
+            cls.manifestFromZip(zip)
         )
         
     def dumpMeta(self, file: BinaryIO) -> None:
@@ -105,7 +181,8 @@ class PPK:
                 "python": str(self.python),
                 "meta": {
                     "ppk-version": str(self.ppkVersion)
-                }
+                },
+                "manifest": {path: entry._asdict() for path, entry in self.manifest.items()}
             }
         }, file)
     def dumpDependencyTree(self, file: BinaryIO) -> None:
@@ -0,0 +1,216 @@
+from typing import Optional
+from collections.abc import Collection, Iterator
+
+import os
+import os.path
+import io
+import json
+import logging
+import configparser
+import errno
+import fcntl
+import shutil
+import stat
+import time
+import tempfile
+import zipfile
+
+from contextlib import contextmanager
+from hashlib import sha256
+from pathlib import Path
+
+from pypackage.util import dataPath
+
+# Wheel data directories that end up in site-packages
+SITE_PACKAGES_SCHEMES = ("purelib", "platlib")
+# Handled by installScripts instead of link
+SCRIPTS_SCHEME = "scripts"
+# Extractions older than this were interrupted and are fair game for garbage collection
+STALE_TEMP_SECONDS = 24 * 60 * 60
+
+ENTRY_POINT_WRAPPER = """#!{python}
+import sys
+from {module} import {head}
+if __name__ == "__main__":
+    sys.exit({call}())
+"""
+
+# Unpacked wheels, keyed by the sha256 of the wheel file. Apps hardlink files out of here
+# and record which objects they use, so uninstalling can throw away anything unreferenced.
+# Stored files are made read-only, since an edit through one app's hardlink would change
+# every other app sharing it.
+class PackageStore:
+    def __init__(self, root: str | Path, create: bool = True):
+        self.root = Path(root)
+        self.objectsPath = self.root / "objects"
+        self.refsPath = self.root / "refs.json"
+        self.lockPath = self.root / "refs.lock"
+        self.logger = logging.getLogger("PackageStore")
+        if create:
+            os.makedirs(self.objectsPath, exist_ok = True)
+
+    @classmethod
+    def default(cls, create: bool = True) -> "PackageStore":
+        return cls(os.path.join(dataPath(), "store"), create)
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return sha256(data).hexdigest()
+
+    def objectPath(self, digest: str) -> Path:
+        return self.objectsPath / digest
+
+    def contains(self, digest: str) -> bool:
+        return self.objectPath(digest).is_dir()
+
+    def add(self, data: bytes, digest: Optional[str] = None) -> str:
+        digest = digest or self.digest(data)
+        if self.contains(digest):
+            return digest
+        # Unpack next to the final location and rename, so a half-extracted wheel is never visible
+        tempPath = tempfile.mkdtemp(prefix = ".tmp-", dir = self.objectsPath)
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as wheel:
+                wheel.extractall(tempPath)
+            self._makeReadOnly(tempPath)
+            os.rename(tempPath, self.objectPath(digest))
+        except OSError as e:
+            shutil.rmtree(tempPath, ignore_errors = True)
+            # Someone else got there first
+            if e.errno not in (errno.EEXIST, errno.ENOTEMPTY) or not self.contains(digest):
+                raise
+        except:
+            shutil.rmtree(tempPath, ignore_errors = True)
+            raise
+        return digest
+
+    @staticmethod
+    def _makeReadOnly(path: str) -> None:
+        # Only the files: directories stay writable so objects can still be deleted
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                filePath = os.path.join(dirpath, filename)
+                mode = os.lstat(filePath).st_mode
+                if not stat.S_ISLNK(mode):
+                    os.chmod(filePath, stat.S_IMODE(mode) & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+    def _objectFiles(self, digest: str) -> Iterator[tuple[Path, str]]:
+        objectPath = self.objectPath(digest)
+        for dirpath, _, filenames in os.walk(objectPath):
+            relativeDir = Path(dirpath).relative_to(objectPath)
+            parts = relativeDir.parts
+            if parts and parts[0].endswith(".data"):
+                if len(parts) < 2 or parts[1] not in SITE_PACKAGES_SCHEMES:
+                    if len(parts) == 2 and parts[1] != SCRIPTS_SCHEME:
+                        self.logger.warning(f"Not installing {parts[1]} files from {parts[0]}")
+                    continue
+                targetDir = Path(*parts[2:])
+            else:
+                targetDir = relativeDir
+            for filename in filenames:
+                yield Path(dirpath, filename), str(targetDir / filename)
+
+    def link(self, digest: str, sitePackages: str | Path) -> list[str]:
+        linked = []
+        for source, target in self._objectFiles(digest):
+            targetPath = os.path.join(sitePackages, target)
+            os.makedirs(os.path.dirname(targetPath), exist_ok = True)
+            if os.path.lexists(targetPath):
+                os.unlink(targetPath)
+            try:
+                os.link(source, targetPath)
+            except OSError as e:
+                # Different filesystem (or one without hardlinks), fall back to copying
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                    raise
+                shutil.copy2(source, targetPath)
+            linked.append(target)
+        return linked
+
+    def _writeScript(self, path: str, content: bytes) -> None:
+        if os.path.lexists(path):
+            os.unlink(path)
+        with open(path, "wb") as script:
+            script.write(content)
+        os.chmod(path, 0o755)
+
+    # Scripts are copied rather than linked, since their shebangs point at the app's interpreter
+    def installScripts(self, digest: str, binPath: str | Path, python: str) -> list[str]:
+        objectPath = self.objectPath(digest)
+        installed = []
+        os.makedirs(binPath, exist_ok = True)
+        for scriptsPath in objectPath.glob(f"*.data/{SCRIPTS_SCHEME}"):
+            for source in scriptsPath.iterdir():
+                if not source.is_file():
+                    continue
+                content = source.read_bytes()
+                firstLine, newline, rest = content.partition(b"\n")
+                if firstLine.rstrip(b"\r") in (b"#!python", b"#!pythonw"):
+                    content = b"#!" + python.encode() + newline + rest
+                self._writeScript(os.path.join(binPath, source.name), content)
+                installed.append(source.name)
+        for entryPointsPath in objectPath.glob("*.dist-info/entry_points.txt"):
+            entryPoints = configparser.ConfigParser(delimiters = ("=",), interpolation = None)
+            entryPoints.optionxform = str
+            entryPoints.read(entryPointsPath, encoding = "utf-8")
+            for section in ("console_scripts", "gui_scripts"):
+                if not entryPoints.has_section(section):
+                    continue
+                for name, value in entryPoints.items(section):
+                    module, _, attr = value.partition(":")
+                    attr = attr.split("[")[0].strip()
+                    if not attr:
+                        self.logger.warning(f"Skipping entry point {name} ({value}): no callable")
+                        continue
+                    wrapper = ENTRY_POINT_WRAPPER.format(python = python, module = module.strip(), head = attr.split(".")[0], call = attr)
+                    self._writeScript(os.path.join(binPath, name), wrapper.encode("utf-8"))
+                    installed.append(name)
+        return installed
+
+    @contextmanager
+    def _lockedRefs(self) -> Iterator[dict[str, set[str]]]:
+        with open(self.lockPath, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if self.refsPath.is_file():
+                    with open(self.refsPath, "r") as refsFile:
+                        refs = {app: set(digests) for app, digests in json.load(refsFile).items()}
+                else:
+                    refs = {}
+                yield refs
+                with tempfile.NamedTemporaryFile("w", dir = self.root, delete = False) as refsFile:
+                    json.dump({app: sorted(digests) for app, digests in refs.items() if digests}, refsFile)
+                os.replace(refsFile.name, self.refsPath)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def references(self) -> dict[str, set[str]]:
+        with self._lockedRefs() as refs:
+            return {app: set(digests) for app, digests in refs.items()}
+
+    def retain(self, app: str, digests: Collection[str]) -> None:
+        with self._lockedRefs() as refs:
+            refs[app] = set(digests)
+
+    def release(self, app: str) -> None:
+        with self._lockedRefs() as refs:
+            refs.pop(app, None)
+
+    def collectGarbage(self) -> list[str]:
+        removed = []
+        with self._lockedRefs() as refs:
+            referenced = set().union(*refs.values())
+            for entry in os.scandir(self.objectsPath):
+                # Leave in-progress extractions alone, but clear out ones that were interrupted
+                if entry.name.startswith(".tmp-"):
+                    try:
+                        stale = time.time() - entry.stat(follow_symlinks = False).st_mtime > STALE_TEMP_SECONDS
+                    except FileNotFoundError:
+                        continue
+                    if stale:
+                        shutil.rmtree(entry.path, ignore_errors = True)
+                    continue
+                if entry.name not in referenced:
+                    shutil.rmtree(entry.path, ignore_errors = True)
+                    removed.append(entry.name)
+        return removed
@@ -1,9 +1,21 @@
-from collections.abc import MutableMapping
+from collections.abc import MutableMapping, Iterable
 from enum import Enum
 from typing import NamedTuple
 
+import os
+import platformdirs
+
 from packaging.version import Version
 from packaging.specifiers import SpecifierSet
+from packaging.tags import Tag
+
+# Interning tables, so that the thousands of package and file records share one
+# Version/SpecifierSet/Tag object per distinct value (and compare by identity first)
+# Keyed on the string form: equal Versions can be spelled differently ("1.0" vs "1.0.0")
+_VERSIONS: dict[str, Version] = {}
+_SPECIFIER_SETS: dict[str, SpecifierSet] = {}
+_TAGS: dict[Tag, Tag] = {}
+_TAG_SETS: dict[frozenset[Tag], frozenset[Tag]] = {}
 
 class DependencyType(Enum):
     SDIST = "sdist"
@@ -12,6 +24,25 @@ class DependencyType(Enum):
 def nthitem(iter, n):
     yield from (i[n] for i in iter)
 
+def internVersion(version: str | Version) -> Version:
+    key = str(version)
+    if (interned := _VERSIONS.get(key)) is None:
+        interned = _VERSIONS.setdefault(key, version if isinstance(version, Version) else Version(key))
+    return interned
+
+def internSpecifierSet(specifiers: str | SpecifierSet) -> SpecifierSet:
+    key = str(specifiers)
+    if (interned := _SPECIFIER_SETS.get(key)) is None:
+        interned = _SPECIFIER_SETS.setdefault(key, specifiers if isinstance(specifiers, SpecifierSet) else SpecifierSet(key))
+    return interned
+
+def internTags(tags: Iterable[Tag]) -> frozenset[Tag]:
+    key = frozenset(_TAGS.setdefault(tag, tag) for tag in tags)
+    return _TAG_SETS.setdefault(key, key)
+
+def dataPath():
+    return platformdirs.user_data_path("pypackage") if os.geteuid() != 0 else platformdirs.site_data_path("pypackage")
+
 def formatPackageName(name, version):
     return f"[bold][cyan]{name}[/cyan] {version}"
 
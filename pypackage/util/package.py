@@ -11,56 +11,77 @@ from packaging.specifiers import SpecifierSet
 from packaging.tags import Tag
 
 from pypackage.ppk import PPKDependencyFile
+from pypackage.util import internVersion, internSpecifierSet, internTags
 
-@dataclass
+@dataclass(frozen = True, slots = True)
 class PackageFile:
     name: str
     version: Version
-@dataclass
+
+    def __post_init__(self):
+        object.__setattr__(self, "version", internVersion(self.version))
+@dataclass(frozen = True, slots = True)
 class RemotePackageFile(PackageFile):
     url: str
     filename: str
-@dataclass
+@dataclass(frozen = True, slots = True)
 class SdistPackageFile(PackageFile):
     pass
-@dataclass
+@dataclass(frozen = True, slots = True)
 class RemoteSdistPackageFile(SdistPackageFile, RemotePackageFile):
     pass
-@dataclass
+@dataclass(frozen = True, slots = True)
 class ArchiveSdistPackageFile(SdistPackageFile):
     archivePath: Path
-@dataclass
+# tags and build are declared on the concrete classes: two slotted bases can't both add
+# fields, and RemoteWheelPackageFile already gets url and filename from RemotePackageFile.
+@dataclass(frozen = True, slots = True)
 class WheelPackageFile(PackageFile):
-    name: str
-    version: Version
+    pass
+@dataclass(frozen = True, slots = True)
+class RemoteWheelPackageFile(WheelPackageFile, RemotePackageFile):
     tags: Collection[Tag]
     build: Optional[int]
-@dataclass
-class RemoteWheelPackageFile(WheelPackageFile, RemotePackageFile):
-    pass
-@dataclass
+
+    def __post_init__(self):
+        PackageFile.__post_init__(self)
+        object.__setattr__(self, "tags", internTags(self.tags))
+@dataclass(frozen = True, slots = True)
 class ArchiveWheelPackageFile(WheelPackageFile):
+    tags: Collection[Tag]
+    build: Optional[int]
     archivePath: Path
 
+    def __post_init__(self):
+        PackageFile.__post_init__(self)
+        object.__setattr__(self, "tags", internTags(self.tags))
+
 class PurePackage:
+    __slots__ = ("name", "version", "pythonSpecifiers", "description", "dependencies", "marker")
     def __init__(
         self,
         name: str,
         version: Version,
         pythonSpecifiers: SpecifierSet,
         description: str = "",
-        dependencies: Collection["PurePackage"] = [],
+        dependencies: Collection["PurePackage"] = (),
         marker: Optional[Marker] = None,
     ):
         self.name = name
-        self.version = version
-        self.pythonSpecifiers = pythonSpecifiers
+        self.version = internVersion(version)
+        self.pythonSpecifiers = internSpecifierSet(pythonSpecifiers)
         self.description = description
         self.dependencies = dependencies
         self.marker = marker
+    def __eq__(self, other):
+        if not isinstance(other, PurePackage):
+            return NotImplemented
+        return self.name == other.name and self.version == other.version
+    def __hash__(self):
+        return hash((self.name, self.version))
     def iterDependencies(self) -> Iterator["PurePackage"]:
         yield self
-        for child in self.data:
+        for child in self.dependencies:
             yield from child.iterDependencies()
     def serialize(self) -> dict[str]:
         return {
@@ -74,6 +95,7 @@ class PurePackage:
     def addFiles(self, files: Collection[PackageFile]) -> "Package":
         return Package(self.name, self.version, self.pythonSpecifiers, files, self.description, self.dependencies, self.marker)
 class Package(PurePackage):
+    __slots__ = ("files",)
     def __init__(
         self,
         name: str,
@@ -81,13 +103,8 @@ class Package(PurePackage):
         pythonSpecifiers: SpecifierSet,
         files: Collection[PackageFile],
         description: str = "",
-        dependencies: Collection["PurePackage"] = [],
+        dependencies: Collection["PurePackage"] = (),
         marker: Optional[Marker] = None
     ):
-        self.name = name
-        self.version = version
-        self.pythonSpecifiers = pythonSpecifiers
-        self.description = description
-        self.dependencies = dependencies
-        self.marker = marker
-        
\ No newline at end of file
+        super().__init__(name, version, pythonSpecifiers, description, dependencies, marker)
+        self.files = files
@@ -1,6 +1,10 @@
 import concurrent.futures
+import os.path
+import shutil
 
 from itertools import repeat
+from urllib.parse import urlparse
+from urllib.request import url2pathname
 
 from rich.progress import Progress
 
@@ -15,6 +19,13 @@ class PooledDownloader:
         self.pool = concurrent.futures.ThreadPoolExecutor(max_workers = workers)
 
     def _downloadUrlToPath(self, label: str, url: str, path: str) -> str: 
+        # Local warehouses hand out file:// URLs, which requests can't fetch
+        if url.startswith("file:"):
+            source = url2pathname(urlparse(url).path)
+            # The artifact cache warehouse can hand back the very file we're downloading to
+            if not (os.path.exists(path) and os.path.samefile(source, path)):
+                shutil.copyfile(source, path)
+            return path
         request = requests.get(url, stream = True)
         if "Content-Length" in request.headers:
             total = int(request.headers["Content-Length"])
@@ -0,0 +1,29 @@
+import platformdirs
+
+from pypackage.locators.local_warehouse import LocalWarehouse
+from pypackage.locators.package_locator import PackageLocator, NegativeCache
+from pypackage.util.package import PurePackage
+from pypackage.util.pooled_downloader import PooledDownloader
+from pypackage.util.progress_manager import ProgressManager
+
+def test_repackage_with_artifact_cache(tmp_path, monkeypatch):
+    # A previous `package` run left its downloads in <cache>/<project>-build
+    cachePath = tmp_path / "cache"
+    buildPath = cachePath / "myproject-build"
+    buildPath.mkdir(parents = True)
+    (buildPath / "foo-1.0.tar.gz").write_bytes(b"sdist")
+    (buildPath / "foo-1.0-py3-none-any.whl").write_bytes(b"wheel")
+    monkeypatch.setattr(platformdirs, "user_cache_path", lambda appname: cachePath)
+
+    locator = PackageLocator([LocalWarehouse.fromArtifactCache()], NegativeCache(str(tmp_path / "not-found.json")))
+    with locator:
+        (_, files), = locator.locatePackages([PurePackage("foo", "1.0", ">=3")])
+    assert {file.filename for file in files} == {"foo-1.0.tar.gz", "foo-1.0-py3-none-any.whl"}
+
+    # ... and the next run downloads them right back onto themselves
+    with PooledDownloader(ProgressManager()) as downloader:
+        futures = {file.filename: downloader.downloadUrlToPath(file.url, str(buildPath / file.filename), file.filename) for file in files}
+        paths = {filename: future.result() for filename, future in futures.items()}
+    assert paths == {filename: str(buildPath / filename) for filename in futures}
+    assert (buildPath / "foo-1.0.tar.gz").read_bytes() == b"sdist"
+    assert (buildPath / "foo-1.0-py3-none-any.whl").read_bytes() == b"wheel"